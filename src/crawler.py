@@ -1,13 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import aiohttp
+from aiohttp_client_cache import CachedSession, SQLiteBackend
+import lxml.html
+from lxml import etree
 import mysql.connector
+from mysql.connector import pooling
 import configparser
 import datetime
+import hashlib
+import os
+import shelve
 from src.logger import logging  # Import logging from the custom logger module
 
 # Load Configurations
 config = configparser.ConfigParser()
-config.read('config\config.ini')
+config.read('config/config.ini')
 
 # MySQL Connection Configuration
 MYSQL_CONFIG = {
@@ -17,27 +25,249 @@ MYSQL_CONFIG = {
     "database": config["MYSQL"]["database"]
 }
 
+# Process-wide connection pool, avoids a TCP + auth handshake per connection. Created on first use so that
+# parser worker processes, which re-import this module, do not open MySQL connections of their own.
+POOL = None
+INSERT_BATCH_SIZE = 500  # Rows per multi-row INSERT, keeps each statement under max_allowed_packet
+
+# Scraper settings, bound once at import
+BASE_URL = config["SCRAPER"]["BASE_URL"]
+SUBJECT = config["SCRAPER"]["subject"]
+ARTICLE_TYPE = config["SCRAPER"]["article_type"]
+PAGES = int(config["SCRAPER"]["PAGES"])
+
+# HTTP settings shared by every listing page and abstract fetch
+HEADERS = {
+    "User-Agent": "MedScraper/0.0.1 (+https://github.com/anduriroshan/MedScraper)",
+    "Accept-Encoding": "gzip, deflate, br"  # aiohttp decodes br when Brotli is installed
+}
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(sock_connect=5, sock_read=20)  # (connect, read) seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+MAX_BODY_BYTES = 2 * 1024 * 1024  # Larger bodies are not cached and are truncated to guard against pathological pages
+MAX_CONCURRENCY = 20  # Number of abstract worker coroutines, i.e. upper bound on in-flight abstract requests
+# Process pool for HTML parsing, runs in parallel across all cores. Created on first use, like POOL, so that
+# importing this module (including in the parser workers themselves) does not start worker processes.
+PARSE_POOL = None
+ABSTRACT_CACHE_PATH = "abstracts.db"  # On-disk URL -> abstract cache, lets reruns skip already fetched articles
+HTTP_CACHE_PATH = "nature_cache"  # SQLite HTTP cache for listing and article pages
+HTTP_CACHE_EXPIRE_AFTER = 3600  # Seconds a cached page is served without going back to Nature
+
+# Compiled XPath expressions, each page is parsed once and queried with these
+XPATH_LISTING_ITEMS = etree.XPath('//li[contains(@class, "app-article-list-row__item")]')
+XPATH_ITEM_TITLE = etree.XPath('normalize-space(.//h3[contains(@class, "c-card__title")])')
+XPATH_ITEM_LINK = etree.XPath('string((.//a)[1]/@href)')
+XPATH_ITEM_DATE = etree.XPath('string((.//time)[1]/@datetime)')
+XPATH_ABSTRACT = etree.XPath('normalize-space((//div[contains(@class, "c-article-section__content")])[1])')
+
 
 def connect_mysql():
     """
     Establish a connection to MySQL database.
 
     Input: None
-    Output: MySQL connection object
+    Output: Pooled MySQL connection object
 
-    This function connects to the MySQL database using credentials from the config file. If the connection fails,
-    it logs the error and raises an exception.
+    This function checks out a connection from the module's connection pool (creating the pool on first use);
+    closing it returns it to the pool. If no connection can be obtained, it logs the error and raises an exception.
     """
+    global POOL
     try:
-        connection = mysql.connector.connect(**MYSQL_CONFIG)
+        if POOL is None:
+            POOL = pooling.MySQLConnectionPool(pool_name="med", pool_size=8, pool_reset_session=True, **MYSQL_CONFIG)
+        connection = POOL.get_connection()
         logging.info("Successfully connected to MySQL.")
         return connection
     except mysql.connector.Error as e:
-        logging.error(f"Error connecting to MySQL: {e}")
+        logging.error("Error connecting to MySQL: %s", e)
         raise
 
 
-def crawl_articles(pages=5):
+def get_parse_pool():
+    """
+    Return the process pool used for HTML parsing, creating it on first use.
+
+    Input: None
+    Output: ProcessPoolExecutor with one worker per CPU core
+    """
+    global PARSE_POOL
+    if PARSE_POOL is None:
+        PARSE_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return PARSE_POOL
+
+
+def url_hash(url):
+    """
+    Hash an article URL for the 'url_hash' column.
+
+    Input:
+        - url (str): The URL of the article page.
+
+    Output:
+        - (bytes): The 16-byte MD5 digest of the URL.
+    """
+    return hashlib.md5(url.encode()).digest()
+
+
+def create_articles_table(cursor):
+    """
+    Create the 'articles' table if it does not exist, and migrate tables created before the 'url_hash' column.
+
+    Input:
+        - cursor (MySQLCursor): A cursor on an open connection.
+
+    Output:
+        - None
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            url_hash BINARY(16) NOT NULL,
+            title VARCHAR(500),
+            pub_date DATE,
+            abstract TEXT,
+            UNIQUE KEY uq_url_hash (url_hash)
+        )
+    """)
+    # Tables created before the url_hash column existed
+    cursor.execute("ALTER TABLE articles ADD COLUMN IF NOT EXISTS url_hash BINARY(16)")
+    cursor.execute("ALTER TABLE articles ADD UNIQUE INDEX IF NOT EXISTS uq_url_hash (url_hash)")
+    logging.info("Verified or created 'articles' table in MySQL.")
+
+
+def fetch_saved_titles():
+    """
+    Fetch the titles of the stored articles that have no URL hash.
+
+    Input: None
+    Output:
+        - titles (set): The set of titles of rows saved before the 'url_hash' column existed.
+
+    Those rows cannot be matched by the upsert in `save_to_mysql`, so the crawler skips them by title instead of
+    saving them a second time. Articles with a URL hash are crawled again and refreshed in place. The table is
+    created or migrated first, so the query also works on the first run against an older table. If MySQL cannot be
+    reached, it returns an empty set.
+    """
+    connection = None
+    try:
+        connection = connect_mysql()
+        cursor = connection.cursor()
+        create_articles_table(cursor)  # The url_hash column must exist before it is queried
+        cursor.execute("SELECT title FROM articles WHERE url_hash IS NULL")
+        return {title for (title,) in cursor.fetchall()}
+    except mysql.connector.Error as e:
+        logging.warning("Could not load saved article titles: %s", e)
+        return set()
+    finally:
+        if connection:
+            connection.close()
+
+
+def is_cacheable(response):
+    """
+    Decide whether a response may be stored in the SQLite HTTP cache.
+
+    Input:
+        - response (ClientResponse or CachedResponse): The response to check.
+
+    Output:
+        - (bool): True if the response declares a Content-Length of at most MAX_BODY_BYTES.
+
+    The cache reads the whole body of every response it stores before `fetch` sees it, so responses without a
+    Content-Length or above the cap are left uncached, and `fetch` streams them under the size cap instead.
+    """
+    return response.content_length is not None and response.content_length <= MAX_BODY_BYTES
+
+
+async def fetch(session, url, params=None):
+    """
+    Fetch a URL over the shared aiohttp session, retrying transient failures.
+
+    Input:
+        - session (CachedSession): The open HTTP session.
+        - url (str): The URL to fetch.
+        - params (dict): Optional query string parameters.
+
+    Output:
+        - tuple: The HTTP status code and the raw response body as bytes (status, body). The body is None if the
+          status is not 200.
+
+    This function retries connection errors and 429/5xx responses up to MAX_RETRIES times with exponential
+    backoff, and returns the last response it received. The body is only downloaded for 200 responses and is
+    truncated to MAX_BODY_BYTES. Responses that are not served from the HTTP cache are streamed, so at most
+    MAX_BODY_BYTES of them are read; only responses whose Content-Length is within the cap are cached (see
+    `is_cacheable`), since caching downloads the whole body first.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with session.get(url, params=params) as response:
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+                    continue
+                if response.status != 200:
+                    return response.status, None
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) >= MAX_BODY_BYTES:
+                        logging.warning("Truncated response body of %s at %s bytes", url, MAX_BODY_BYTES)
+                        break
+                return response.status, bytes(body[:MAX_BODY_BYTES])
+        except aiohttp.ClientConnectionError:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+
+def parse_listing(body):
+    """
+    Parse a listing page into article entries.
+
+    Input:
+        - body (bytes): The raw HTML of a listing page.
+
+    Output:
+        - tuple: A list of (title, pub_date, link) tuples and a list of error messages for items that could not
+          be parsed (entries, errors).
+
+    This function runs in a parser worker process, so errors are returned to the caller to be logged instead of
+    being logged here. A page whose body cannot be parsed at all (e.g. an empty body) yields no entries.
+    """
+    try:
+        tree = lxml.html.fromstring(body)  # lxml detects the charset from the raw bytes
+    except etree.ParserError as e:
+        return [], [str(e)]
+
+    entries, errors = [], []
+    for item in XPATH_LISTING_ITEMS(tree):
+        try:
+            href = XPATH_ITEM_LINK(item)
+            if not href:
+                raise ValueError("article link not found")
+            title = XPATH_ITEM_TITLE(item) or "No Title"
+            link = "https://www.nature.com" + href
+            pub_date = XPATH_ITEM_DATE(item) or "No Date"
+            entries.append((title, pub_date, link))
+        except Exception as e:
+            errors.append(str(e))
+    return entries, errors
+
+
+def parse_abstract(body):
+    """
+    Parse the abstract out of an article detail page.
+
+    Input:
+        - body (bytes): The raw HTML of an article page.
+
+    Output:
+        - abstract (str): The abstract of the article or "No Abstract" if not found.
+    """
+    return XPATH_ABSTRACT(lxml.html.fromstring(body)) or "No Abstract"
+
+
+async def crawl_articles(pages=5):
     """
     Crawl article details (title, publication date, abstract) from Nature's Oncology section.
 
@@ -48,72 +278,129 @@ def crawl_articles(pages=5):
         - articles (list): A list of dictionaries, where each dictionary contains article details like title,
           publication date, and abstract.
 
-    This function fetches article titles, publication dates, and abstracts by crawling through multiple pages of
-    Nature's Oncology section based on the given number of pages. The articles are parsed from the HTML and
-    stored in a list.
+    This function crawls multiple pages of Nature's Oncology section as a producer/consumer pipeline: the next
+    listing page is downloaded while the current one is parsed, article links are put on a queue consumed by
+    MAX_CONCURRENCY worker coroutines that fetch the abstracts, and all HTML parsing runs in PARSE_POOL so it
+    never blocks the event loop. Links seen earlier in the crawl and articles stored without a URL hash are
+    skipped; other stored articles are crawled again so `save_to_mysql` refreshes them. Abstracts are looked up
+    in an on-disk cache before being fetched, and pages fetched within the last HTTP_CACHE_EXPIRE_AFTER seconds
+    are served from the SQLite HTTP cache.
     """
-    BASE_URL = config["SCRAPER"]["BASE_URL"]
-    subject = config["SCRAPER"]["subject"]
-    article_type = config["SCRAPER"]["article_type"]
+    pages = int(pages)
 
-    articles = []
-    for page in range(1, int(pages) + 1):
+    def fetch_page(session, page):
         params = {
-            "subject": subject,
-            "article_type": article_type,
+            "subject": SUBJECT,
+            "article_type": ARTICLE_TYPE,
             "page": page
         }
+        logging.info("Crawling page %s...", page)
+        return asyncio.create_task(fetch(session, BASE_URL, params=params))
 
-        logging.info(f"Crawling page {page}...")
-        response = requests.get(BASE_URL, params=params)
-
-        if response.status_code != 200:
-            logging.error(f"Failed to fetch page {page}, status code: {response.status_code}")
-            continue
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        article_items = soup.find_all("li", class_="app-article-list-row__item")
-
-        for item in article_items:
-            try:
-                title_tag = item.find("h3", class_="c-card__title")
-                title = title_tag.get_text(strip=True) if title_tag else "No Title"
-                link = "https://www.nature.com" + item.find("a")["href"]
-                pub_date = item.find("time")["datetime"] if item.find("time") else "No Date"
-                abstract = fetch_abstract(link)
-
-                articles.append({
-                    "title": title,
-                    "pub_date": pub_date,
-                    "abstract": abstract
-                })
-                logging.info(f"Fetched article: {title}")
-            except Exception as e:
-                logging.error(f"Error parsing article on page {page}: {e}")
+    loop = asyncio.get_running_loop()
+    articles = []
+    queue = asyncio.Queue()
+    seen = set()
+    saved_titles = fetch_saved_titles()
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+    with shelve.open(ABSTRACT_CACHE_PATH) as abstract_cache:
+        http_cache = SQLiteBackend(HTTP_CACHE_PATH, expire_after=HTTP_CACHE_EXPIRE_AFTER, allowed_codes=(200,),
+                                   filter_fn=is_cacheable)
+        async with CachedSession(cache=http_cache, connector=connector, headers=HEADERS,
+                                 timeout=REQUEST_TIMEOUT) as session:
+            workers = [asyncio.create_task(abstract_worker(session, queue, abstract_cache, articles))
+                       for _ in range(MAX_CONCURRENCY)]
+
+            next_page = fetch_page(session, 1) if pages > 0 else None
+            for page in range(1, pages + 1):
+                status, body = await next_page
+
+                # Start downloading the next listing page while this one is parsed and its articles fetched
+                if page < pages:
+                    next_page = fetch_page(session, page + 1)
+
+                if status != 200:
+                    logging.error("Failed to fetch page %s, status code: %s", page, status)
+                    continue
+
+                entries, errors = await loop.run_in_executor(get_parse_pool(), parse_listing, body)
+                for error in errors:
+                    logging.error("Error parsing article on page %s: %s", page, error)
+                for entry in entries:
+                    title, _, link = entry
+                    # Listing pages overlap, and rows saved before the url_hash column cannot be upserted
+                    if link in seen or title in saved_titles:
+                        continue
+                    seen.add(link)
+                    queue.put_nowait(entry)
+
+            # Wait for the workers to drain the queue, then stop them
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
     return articles
 
 
-def fetch_abstract(url):
+async def abstract_worker(session, queue, abstract_cache, articles):
+    """
+    Consume article entries from the queue and fetch their abstracts.
+
+    Input:
+        - session (CachedSession): The open HTTP session.
+        - queue (asyncio.Queue): Queue of (title, pub_date, link) tuples produced by `crawl_articles`.
+        - abstract_cache (shelve.Shelf): On-disk cache of abstracts keyed by article URL.
+        - articles (list): The list that completed article dictionaries are appended to.
+
+    Output:
+        - None
+
+    This coroutine runs until it is cancelled by `crawl_articles` once the queue has been drained.
+    """
+    while True:
+        title, pub_date, link = await queue.get()
+        try:
+            abstract = await fetch_abstract(session, link, abstract_cache)
+            articles.append({
+                "url": link,
+                "title": title,
+                "pub_date": pub_date,
+                "abstract": abstract
+            })
+            logging.info("Fetched article: %s", title)
+        finally:
+            queue.task_done()
+
+
+async def fetch_abstract(session, url, abstract_cache):
     """
     Fetch the abstract of an article from its detail page.
 
     Input:
+        - session (CachedSession): The open HTTP session.
         - url (str): The URL of the article page.
+        - abstract_cache (shelve.Shelf): On-disk cache of abstracts keyed by article URL.
 
     Output:
         - abstract (str): The abstract of the article or "No Abstract" if not found.
 
-    This function fetches the abstract by making an HTTP request to the article's URL, parses the page's HTML,
-    and extracts the abstract text. If the abstract is not found, it returns "No Abstract".
+    This function returns the cached abstract if the URL was fetched by a previous run. Otherwise it makes an HTTP
+    request to the article's URL, parses the page's HTML in PARSE_POOL, extracts the abstract text and caches
+    it. If the abstract is not found, it returns "No Abstract".
     """
+    if url in abstract_cache:
+        return abstract_cache[url]
     try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        abstract_section = soup.find("div", class_="c-article-section__content")
-        return abstract_section.get_text(strip=True) if abstract_section else "No Abstract"
+        status, body = await fetch(session, url)
+        if status != 200:
+            logging.error("Failed to fetch abstract for %s, status code: %s", url, status)
+            return "No Abstract"
+        abstract = await asyncio.get_running_loop().run_in_executor(get_parse_pool(), parse_abstract, body)
+        abstract_cache[url] = abstract
+        return abstract
     except Exception as e:
-        logging.error(f"Error fetching abstract for {url}: {e}")
+        logging.error("Error fetching abstract for %s: %s", url, e)
         return "No Abstract"
 
 
@@ -122,36 +409,44 @@ def save_to_mysql(articles):
     Save the crawled articles into the MySQL database.
 
     Input:
-        - articles (list): A list of dictionaries containing article details (title, pub_date, abstract).
+        - articles (list): A list of dictionaries containing article details (url, title, pub_date, abstract).
 
     Output:
         - None
 
     This function saves the article data into the MySQL database. It first checks if the 'articles' table exists,
-    and creates it if necessary. Then, it inserts each article into the table.
+    and creates it if necessary (see `create_articles_table`). Then, it upserts the articles, keyed by the MD5 hash
+    of their URL, with one multi-row INSERT ... ON DUPLICATE KEY UPDATE per INSERT_BATCH_SIZE rows, all inside a
+    single transaction. A stored abstract or publication date is kept when the new crawl only found the
+    "No Abstract" or "No Date" placeholder, so a failed fetch never overwrites good data.
     """
+    connection = None
     try:
         connection = connect_mysql()
         cursor = connection.cursor()
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS articles (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                title VARCHAR(500),
-                pub_date DATE,
-                abstract TEXT
-            )
-        """)
-        logging.info("Verified or created 'articles' table in MySQL.")
-
-        insert_query = "INSERT INTO articles (title, pub_date, abstract) VALUES (%s, %s, %s)"
-        for article in articles:
-            cursor.execute(insert_query, (article["title"], article["pub_date"], article["abstract"]))
+        create_articles_table(cursor)
+
+        # "No Date" cannot be stored in the DATE column, it is saved as NULL
+        rows = [(url_hash(article["url"]), article["title"],
+                 None if article["pub_date"] == "No Date" else article["pub_date"], article["abstract"])
+                for article in articles]
+        connection.start_transaction()
+        for i in range(0, len(rows), INSERT_BATCH_SIZE):
+            chunk = rows[i:i + INSERT_BATCH_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            flat = [value for row in chunk for value in row]
+            cursor.execute(f"""
+                INSERT INTO articles (url_hash, title, pub_date, abstract) VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    abstract = IF(VALUES(abstract) = 'No Abstract', abstract, VALUES(abstract)),
+                    pub_date = COALESCE(VALUES(pub_date), pub_date)
+            """, flat)
 
         connection.commit()
-        logging.info(f"Successfully inserted {len(articles)} articles into MySQL.")
+        logging.info("Successfully inserted %s articles into MySQL.", len(articles))
     except mysql.connector.Error as e:
-        logging.error(f"Error saving articles to MySQL: {e}")
+        logging.error("Error saving articles to MySQL: %s", e)
     finally:
         if connection:
             connection.close()
@@ -164,12 +459,12 @@ if __name__ == "__main__":
         logging.info("Starting article crawling process...")
 
         # Load the number of pages to scrape from the configuration
-        pages_to_scrape = int(config["SCRAPER"]["PAGES"])
-        logging.info(f"Configured to crawl {pages_to_scrape} pages.")
+        pages_to_scrape = PAGES
+        logging.info("Configured to crawl %s pages.", pages_to_scrape)
 
         # Step 1: Crawl articles
-        articles = crawl_articles(pages=pages_to_scrape)
-        logging.info(f"Total articles fetched: {len(articles)}")
+        articles = asyncio.run(crawl_articles(pages=pages_to_scrape))
+        logging.info("Total articles fetched: %s", len(articles))
 
         # Step 2: Save articles to MySQL
         if articles:
@@ -182,4 +477,4 @@ if __name__ == "__main__":
         logging.info("Article crawling process completed successfully.")
 
     except Exception as e:
-        logging.error(f"An unexpected error occurred: {e}")
+        logging.error("An unexpected error occurred: %s", e)
@@ -1,15 +1,31 @@
 import logging
+import logging.handlers
+import atexit
+import multiprocessing
 import os
+import queue
 from datetime import datetime
 
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-logs_path = os.path.join(os.getcwd(),"logs",LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
+# Worker processes (e.g. the crawler's HTML parsers) re-import this module, only the main process writes the log
+if multiprocessing.current_process().name == "MainProcess":
+    LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+    logs_path = os.path.join(os.getcwd(),"logs",LOG_FILE)
+    os.makedirs(logs_path,exist_ok=True)
 
-LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
+    LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
 
-logging.basicConfig(
-    filename = LOG_FILE_PATH,
-    format = "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level = logging.INFO,
-)
\ No newline at end of file
+    # Records are put on a queue and written to the file by a background thread, so logging never blocks on file I/O
+    log_queue = queue.Queue(-1)
+    file_handler = logging.FileHandler(LOG_FILE_PATH)
+    file_handler.setFormatter(logging.Formatter("[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)  # Flush queued records on interpreter exit
+
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))  # Only merge the args, the file handler adds the rest
+
+    logging.basicConfig(
+        handlers = [queue_handler],
+        level = logging.INFO,
+    )
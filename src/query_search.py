@@ -1,26 +1,66 @@
 from pymilvus import Collection, connections
-from sentence_transformers import SentenceTransformer
-import mysql.connector
 import configparser
-from datetime import datetime, timedelta
+from functools import lru_cache
+from datetime import datetime, timedelta, time
 import re
-import spacy
+from src.embedding import load_embedding_model
 from src.logger import logging
 
 # Load Configurations
 config = configparser.ConfigParser()
 config.read("config/config.ini")
 
-MYSQL_CONFIG = {
-    "host": config["MYSQL"]["host"],
-    "user": config["MYSQL"]["user"],
-    "password": config["MYSQL"]["password"],
-    "database": config["MYSQL"]["database"]
+# Milvus settings, bound once at import
+MILVUS_HOST = config["MILVUS"]["host"]
+MILVUS_PORT = config["MILVUS"]["port"]
+COLLECTION_NAME = config["MILVUS"]["collection_name"]
+
+SEARCH_LIMIT = 50  # Number of Milvus hits retrieved per query
+
+# Load the embedding model and the Milvus collection once, so every query in the interactive loop reuses them
+_MODEL = load_embedding_model()
+connections.connect(host=MILVUS_HOST, port=MILVUS_PORT)
+_COLLECTION = Collection(COLLECTION_NAME)
+_COLLECTION.load()
+
+# All supported time expressions in one alternation, so each query is handled by a single compiled regex. Each
+# alternative is a named group and the name of the group that matched selects how the date range is built. Every
+# branch is anchored with `match` and skips ahead with '.*?', so the branches are tried in order over the whole query:
+# year expressions take precedence over relative ones, wherever they appear ("last week in 2023" means 2023).
+_DATE_RE = re.compile(
+    r'.*?in (?P<in_year>\d{4})'  # "in 2023"
+    r'|.*?year (?P<year_of>\d{4})'  # "year 2023"
+    r'|.*?(?P<year_suffix>\d{4}) year'  # "2023 year"
+    r'|.*?(?P<last_week>last week)'
+    r'|.*?(?P<yesterday>yesterday)'
+    r'|.*?(?P<this_month>this month)'
+    r'|.*?(?P<last_month>last month)',
+    re.DOTALL
+)
+
+
+def _year_range(match, today):
+    """Date range covering the whole year held by the matched group."""
+    year = int(match.group(match.lastgroup))
+    return datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
+
+
+def _since(start):
+    """Build a handler for a relative expression, ranging from `start(today)` up to today."""
+    return lambda match, today: (start(today).date(), today.date())
+
+
+# Range builder for each named group of _DATE_RE, called with the match and today's datetime
+_DATE_HANDLERS = {
+    "in_year": _year_range,
+    "year_of": _year_range,
+    "year_suffix": _year_range,
+    "last_week": _since(lambda today: today - timedelta(days=7)),
+    "yesterday": _since(lambda today: today - timedelta(days=1)),
+    "this_month": _since(lambda today: today.replace(day=1)),
+    "last_month": _since(lambda today: (today.replace(day=1) - timedelta(days=1)).replace(day=1)),
 }
 
-# Load English NLP Model for Query Parsing
-nlp = spacy.load("en_core_web_sm")
-
 
 def parse_advanced_date_from_query(query):
     """
@@ -35,73 +75,22 @@ def parse_advanced_date_from_query(query):
     Purpose:
         This function parses natural language time expressions such as "last week", "yesterday", "this month", "2023 year", etc.
         and returns the corresponding date range. It provides support for both relative and year-based queries.
+        The query is matched once against _DATE_RE and the matched group selects its handler in _DATE_HANDLERS.
     """
     today = datetime.today()
-    query = query.lower()
-
-    # Patterns for year-based queries
-    year_patterns = [
-        r'in (\d{4})',  # "in 2023"
-        r'year (\d{4})',  # "year 2023"
-        r'(\d{4}) year',  # "2023 year"
-    ]
-
-    # Check for year-specific queries first
-    for pattern in year_patterns:
-        match = re.search(pattern, query)
-        if match:
-            year = int(match.group(1))
-            return datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
-
-    # Existing time-based parsing from original function
-    if "last week" in query:
-        start_date = today - timedelta(days=7)
-    elif "yesterday" in query:
-        start_date = today - timedelta(days=1)
-    elif "this month" in query:
-        start_date = today.replace(day=1)
-    elif "last month" in query:
-        first_day_of_this_month = today.replace(day=1)
-        start_date = first_day_of_this_month - timedelta(days=1)
-        start_date = start_date.replace(day=1)
-    else:
-        # Default to a wide range if no specific time is found
-        start_date = today - timedelta(days=30)
-
-    return start_date.date(), today.date()
-
-
-def fetch_articles_from_mysql(ids, start_date, end_date):
-    """
-    Fetch articles by their IDs and filter by publication date.
-
-    Input:
-        - ids (list): List of article IDs to fetch from MySQL.
-        - start_date (date): The start date for filtering articles.
-        - end_date (date): The end date for filtering articles.
 
-    Output:
-        - list: A list of tuples containing article data (id, title, pub_date).
+    match = _DATE_RE.match(query.lower())
+    if match:
+        return _DATE_HANDLERS[match.lastgroup](match, today)
 
-    Purpose:
-        This function retrieves articles from the MySQL database based on the specified article IDs and filters them
-        by publication date within the given range (start_date to end_date).
-    """
-    connection = mysql.connector.connect(**MYSQL_CONFIG)
-    cursor = connection.cursor()
-
-    placeholders = ", ".join(["%s"] * len(ids))  # Prepare placeholders for IN clause
-    query = f"""
-        SELECT id, title, pub_date 
-        FROM articles 
-        WHERE id IN ({placeholders}) AND pub_date BETWEEN %s AND %s
-    """
+    # Default to a wide range if no specific time is found
+    return (today - timedelta(days=30)).date(), today.date()
 
-    cursor.execute(query, ids + [start_date, end_date])
-    articles = cursor.fetchall()
-    connection.close()
 
-    return articles
+@lru_cache(maxsize=1024)
+def _embed_query(query):
+    """Normalized query embedding, cached so repeated queries in the interactive loop skip the model."""
+    return _MODEL.encode([query], normalize_embeddings=True)[0]
 
 
 def search_articles(query):
@@ -112,58 +101,51 @@ def search_articles(query):
         - query (str): The natural language query for searching articles (e.g., "Give me the journals published last week").
 
     Output:
-        - list: A list of articles that match the search criteria (filtered by date and relevance).
+        - list: A list of tuples (id, title, pub_date) for the articles that match the search criteria (filtered by date
+          and relevance), ordered by relevance.
 
     Purpose:
         This function takes a natural language query, parses the date range (using the `parse_advanced_date_from_query` function),
-        and then performs a semantic search in Milvus to find articles that match the query. It retrieves article IDs from Milvus,
-        fetches the corresponding articles from MySQL, and returns the results filtered by date.
+        and then performs a semantic search in Milvus, restricted to that date range, to find articles that match the query.
+        Milvus returns the title and publication date of each hit alongside its ID, so no MySQL round trip is needed.
     """
     try:
         # Step 1: Parse the date range from the query
         start_date, end_date = parse_advanced_date_from_query(query)
         logging.info(f"Searching for articles published between {start_date} and {end_date}")
 
-        # Step 2: Connect to Milvus and perform semantic search
-        connections.connect(host=config["MILVUS"]["host"], port=config["MILVUS"]["port"])
-        collection = Collection(config["MILVUS"]["collection_name"])
-        collection.load()
-
-        # Use a more advanced embedding model for better semantic understanding
-        model = SentenceTransformer("multi-qa-MiniLM-L6-cos-v1")  # More powerful model
-        embedding = model.encode([query])[0]
+        # Step 2: Perform semantic search in Milvus with the preloaded model and collection
+        embedding = _embed_query(query)
 
-        # More flexible search parameters
+        # Search parameters for the HNSW index, inner product on normalized embeddings is cosine similarity
         search_params = {
-            "metric_type": "L2",
+            "metric_type": "IP",
             "params": {
-                "nprobe": 20,  # Increased for broader search
-                "ef": 100  # Extended search range
+                "ef": 64  # Lowest of 32/64/128/256 worth benchmarking first, must be >= the search limit
             }
         }
 
-        # Increased search limit to capture more potential matches
-        results = collection.search([embedding], anns_field="embedding", param=search_params, limit=50)
+        # Filter by publication date inside Milvus so the whole top-K budget goes to articles in range
+        start_epoch = int(datetime.combine(start_date, time.min).timestamp())
+        end_epoch = int(datetime.combine(end_date, time.max).timestamp())
+        expr = f"pub_date_epoch >= {start_epoch} and pub_date_epoch <= {end_epoch}"
 
-        # Step 3: Retrieve IDs from Milvus results
-        article_ids = [hit.id for hit in results[0]]
-        if not article_ids:
-            logging.info("No relevant articles found in Milvus.")
+        # Increased search limit to capture more potential matches
+        results = _COLLECTION.search([embedding], anns_field="embedding", param=search_params, limit=SEARCH_LIMIT,
+                                     expr=expr, output_fields=["title", "pub_date_epoch"])
+
+        # Step 3: Read the article details stored alongside the embeddings
+        articles = [(hit.id, hit.entity.get("title"), datetime.fromtimestamp(hit.entity.get("pub_date_epoch")).date())
+                    for hit in results[0]]
+        if not articles:
+            logging.info("No relevant articles found in Milvus for the specified date range.")
             return []
 
-        # Step 4: Fetch details from MySQL and filter by date
-        logging.info("Fetching article details from MySQL...")
-        articles = fetch_articles_from_mysql(article_ids, start_date, end_date)
-
-        # Step 5: Display and return results
-        if articles:
-            print("\nSearch Results:")
-            for article in articles:
-                print(f"ID: {article[0]}, Title: {article[1]}, Date: {article[2]}")
-            return articles
-        else:
-            logging.info("No articles match the specified date range.")
-            return []
+        # Step 4: Display and return results
+        print("\nSearch Results:")
+        for article in articles:
+            print(f"ID: {article[0]}, Title: {article[1]}, Date: {article[2]}")
+        return articles
 
     except Exception as e:
         logging.error(f"An error occurred during search: {e}")
@@ -1,12 +1,12 @@
 #!/bin/bash
 echo "Running crawler..."
-python crawler_application.py
+python crawler.py
 
 echo "Running summarization..."
 python summarization.py
 
 echo "Inserting embeddings into Milvus..."
-python vector_milvus.py
+python vector.py
 
 echo "Running query search..."
 python query_search.py
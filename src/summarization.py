@@ -1,9 +1,9 @@
 import mysql.connector
 import configparser
-from transformers import pipeline  # Hugging Face pipeline
+import os
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from src.logger import logging
-from concurrent.futures import ThreadPoolExecutor
 
 # Load Configurations
 config = configparser.ConfigParser()
@@ -16,94 +16,165 @@ MYSQL_CONFIG = {
     "database": config["MYSQL"]["database"]
 }
 
-# Use a smaller, faster model for CPU
-summarizer = pipeline("summarization", model="t5-small", device=-1)  # Use CPU
+# The summarization model is loaded on first use, so importers of extract_keywords_tfidf don't pay for it
+_summarizer = None
+T5_ONNX_DIR = "t5-onnx"  # Local ONNX Runtime export of t5-small, created on first use
+T5_PREFIX = "summarize: "  # Task prefix t5-small expects for summarization
+STREAM_BATCH_SIZE = 256  # Rows pulled from MySQL at a time, so the corpus is never held in memory at once
 
 
-def extract_keywords_tfidf(text, num_keywords=5):
+def _get_summarizer():
     """
-    Extract top keywords using TF-IDF.
+    Return the shared t5-small tokenizer and ONNX Runtime model, loading them on first use.
+
+    Input: None
+
+    Output:
+        - tuple: The tokenizer and the `ORTModelForSeq2SeqLM` model (tokenizer, model).
+
+    Purpose:
+        On first use this function exports `t5-small` to ONNX, applies ONNX Runtime graph optimizations and saves
+        the result to T5_ONNX_DIR. Later runs load the optimized export directly.
+    """
+    global _summarizer
+    if _summarizer is None:
+        # Imported lazily as optimum and transformers are slow to import
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTOptimizer
+        from optimum.onnxruntime.configuration import OptimizationConfig
+        from transformers import AutoTokenizer
+
+        if not os.path.isdir(T5_ONNX_DIR):
+            model = ORTModelForSeq2SeqLM.from_pretrained("t5-small", export=True)
+            ORTOptimizer.from_pretrained(model).optimize(
+                save_dir=T5_ONNX_DIR, optimization_config=OptimizationConfig(optimization_level=99))
+            AutoTokenizer.from_pretrained("t5-small").save_pretrained(T5_ONNX_DIR)
+        _summarizer = (AutoTokenizer.from_pretrained(T5_ONNX_DIR),
+                       ORTModelForSeq2SeqLM.from_pretrained(T5_ONNX_DIR))
+    return _summarizer
+
+
+def extract_keywords_tfidf(texts, num_keywords=5, max_features=20000):
+    """
+    Extract top keywords for each text using TF-IDF fitted over the whole corpus.
 
     Input:
-        - text (str): The text to analyze.
-        - num_keywords (int): Number of keywords to extract (default is 5).
+        - texts (iterable): The texts to analyze, a list or a generator streaming them.
+        - num_keywords (int): Number of keywords to extract per text (default is 5).
+        - max_features (int): Maximum vocabulary size of the vectorizer (default is 20000).
 
     Output:
-        - (str): A comma-separated string of keywords.
+        - (list): A comma-separated string of keywords for each text, in the order the texts were given.
 
     Purpose:
-        This function takes an input text and uses the TF-IDF method to extract the top 'num_keywords' keywords from it.
+        This function fits a single TF-IDF vectorizer over all texts, so the IDF weights reflect how rare a term is
+        across the corpus, and takes the 'num_keywords' highest-scoring terms of each text from the sparse matrix.
         TF-IDF helps identify the most relevant words in the text based on their frequency and importance.
     """
-    vectorizer = TfidfVectorizer(stop_words="english", max_features=num_keywords)
-    tfidf_matrix = vectorizer.fit_transform([text])
-    keywords = vectorizer.get_feature_names_out()
-    return ", ".join(keywords)
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=max_features)
+    tfidf_matrix = vectorizer.fit_transform(texts)
+    vocab = vectorizer.get_feature_names_out()
+
+    keywords = []
+    # Walk the CSR rows directly, only the non-zero scores of each text are candidates
+    for start, end in zip(tfidf_matrix.indptr[:-1], tfidf_matrix.indptr[1:]):
+        scores = tfidf_matrix.data[start:end]
+        top = tfidf_matrix.indices[start:end][np.argsort(-scores)[:num_keywords]]
+        keywords.append(", ".join(vocab[top]))
+    return keywords
 
 
 def summarize_texts_in_batch(texts, batch_size=10):
     """
-    Summarize a list of texts in batches using Hugging Face Transformers with dynamic length calculation.
+    Summarize a list of texts in batches using an ONNX Runtime export of t5-small with dynamic length calculation.
 
     Input:
         - texts (list): A list of strings (texts) to summarize.
         - batch_size (int): Number of texts to process in a batch (default is 10).
 
     Output:
-        - summaries (list): A list of summarized texts.
+        - summaries (list): A list of summarized texts, in the same order as `texts`.
 
     Purpose:
-        This function processes a list of texts by splitting them into batches. It calculates dynamic lengths for
-        each text and uses the Hugging Face model (`t5-small`) to generate summaries for each batch.
-        It returns the list of summarized texts.
+        This function sorts the texts by length and splits them into batches, so texts in a batch need little padding.
+        Each batch is tokenized together and summarized with a single `generate` call, with the summary length
+        derived from the lengths of the texts in the batch. It returns the list of summarized texts.
     """
-    summaries = []
+    summaries = [None] * len(texts)
     try:
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-
-            # Dynamically calculate max_length and min_length for each text
-            max_lengths = [max(20, int(len(text.split()) * 0.5)) for text in batch]
-            min_lengths = [max(10, int(len(text.split()) * 0.3)) for text in batch]
-
-            # Summarize each batch
-            results = []
-            for idx, text in enumerate(batch):
-                max_len = max_lengths[idx]
-                min_len = min_lengths[idx]
-                result = summarizer(text, max_length=max_len, min_length=min_len, do_sample=False)
-                results.append(result[0]["summary_text"])
-
-            summaries.extend(results)
-            print(f"Processed {len(summaries)} articles so far...")
+        tokenizer, model = _get_summarizer()
+
+        # Group texts of similar length together to minimise padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i].split()))
+        for i in range(0, len(order), batch_size):
+            indices = order[i:i + batch_size]
+            batch = [texts[idx] for idx in indices]
+
+            # Dynamically calculate max_length and min_length for the batch
+            max_len = max(max(20, int(len(text.split()) * 0.5)) for text in batch)
+            min_len = min(max(10, int(len(text.split()) * 0.3)) for text in batch)
+
+            # Summarize the whole batch in one greedy generate call
+            inputs = tokenizer([T5_PREFIX + text for text in batch], padding=True, truncation=True,
+                               max_length=512, return_tensors="pt")
+            outputs = model.generate(**inputs, max_length=max_len, min_length=min_len, num_beams=1,
+                                     do_sample=False, no_repeat_ngram_size=3)
+            for idx, summary in zip(indices, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                summaries[idx] = summary
+
+            print(f"Processed {i + len(batch)} articles so far...")
     except Exception as e:
         logging.error(f"Error during batch summarization: {e}")
-        summaries.extend(["Error"] * len(texts))  # Placeholder for failed batches
-    return summaries
+    # Placeholder for texts in failed batches
+    return [summary if summary is not None else "Error" for summary in summaries]
 
 
-def parallel_summarize(texts, batch_size=10):
+def stream_rows(cursor, query, batch_size=STREAM_BATCH_SIZE):
     """
-    Parallelize text summarization using ThreadPoolExecutor.
+    Run a query on an unbuffered cursor and yield its result in batches.
 
     Input:
-        - texts (list): A list of texts to summarize.
-        - batch_size (int): Number of texts to process in a batch (default is 10).
+        - cursor (MySQLCursor): An unbuffered cursor.
+        - query (str): The SELECT statement to run.
+        - batch_size (int): Number of rows per batch (default is STREAM_BATCH_SIZE).
+
+    Output:
+        - (generator): Yields lists of up to 'batch_size' rows.
+
+    Purpose:
+        Rows are pulled from the server as they are consumed instead of being materialized with fetchall. The
+        connection cannot run other statements until the generator is exhausted.
+    """
+    cursor.execute(query)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def page_rows(cursor, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield the (id, abstract) rows of the articles table in id order, one page at a time.
+
+    Input:
+        - cursor (MySQLCursor): A buffered cursor.
+        - batch_size (int): Number of rows per page (default is STREAM_BATCH_SIZE).
 
     Output:
-        - summaries (list): A list of summarized texts.
+        - (generator): Yields lists of up to 'batch_size' rows.
 
     Purpose:
-        This function splits the texts into batches and uses the ThreadPoolExecutor to parallelize the summarization
-        process. It speeds up the process by summarizing multiple texts simultaneously.
+        Each page is a short keyset query ('WHERE id > last id') that is read completely before it is yielded, so no
+        result set is left open on the server while the caller spends time on a page.
     """
-    summaries = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_summary = [executor.submit(summarize_texts_in_batch, texts[i:i + batch_size])
-                             for i in range(0, len(texts), batch_size)]
-        for future in future_to_summary:
-            summaries.extend(future.result())
-    return summaries
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, abstract FROM articles WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        yield rows
 
 
 def summarize_articles():
@@ -117,11 +188,14 @@ def summarize_articles():
         - None
 
     Purpose:
-        This function fetches the article abstracts from the MySQL database, summarizes them in batches,
-        extracts keywords using TF-IDF, and updates the summaries and keywords in the database.
+        This function streams the article abstracts from the MySQL database twice: first to fit TF-IDF and extract
+        keywords over the whole corpus, then in batches of STREAM_BATCH_SIZE rows that are summarized and written
+        back to the database together with their keywords. Peak memory no longer grows with the size of the corpus.
+        The second pass pages through the table by id and commits every batch, so a slow summarization batch never
+        holds a result set open on the server and an interrupted run keeps the summaries written so far.
     """
     connection = mysql.connector.connect(**MYSQL_CONFIG)
-    cursor = connection.cursor()
+    cursor = connection.cursor(buffered=False)
 
     # Add summary and keywords columns if they don't exist
     try:
@@ -136,32 +210,48 @@ def summarize_articles():
     except Exception as e:
         logging.error(f"Error altering table: {e}")
 
-    # Fetch article abstracts
-    cursor.execute("SELECT id, abstract FROM articles")
-    articles = cursor.fetchall()
-
     # Process abstracts in batches
-    batch_size = 10  # Adjust for your hardware
-    article_ids, abstracts = zip(*articles)
+    batch_size = 16  # Adjust for your hardware
+    query = "SELECT id, abstract FROM articles ORDER BY id"
 
     # Print the number of articles being processed
-    print(f"Processing {len(articles)} articles...")
-
-    summaries = parallel_summarize(abstracts, batch_size=10)
-
-    # Extract keywords and update database
-    for idx, (article_id, abstract) in enumerate(zip(article_ids, abstracts)):
-        try:
-            keywords = extract_keywords_tfidf(abstract)
-            cursor.execute("UPDATE articles SET summary=%s, keywords=%s WHERE id=%s",
-                           (summaries[idx], keywords, article_id))
-            logging.info(f"Processed article ID: {article_id}")
-            print(f"Processed article ID: {article_id}")  # Print for debugging
-        except Exception as e:
-            logging.error(f"Error processing article ID {article_id}: {e}")
-            print(f"Error processing article ID {article_id}")  # Print for debugging
-
-    connection.commit()
+    cursor.execute("SELECT COUNT(*) FROM articles")
+    print(f"Processing {cursor.fetchone()[0]} articles...")
+
+    # Pass 1: extract keywords over the whole corpus, the vectorizer consumes the abstracts as they stream in
+    article_ids = []
+
+    def streamed_abstracts():
+        for rows in stream_rows(cursor, query):
+            for article_id, abstract in rows:
+                article_ids.append(article_id)
+                yield abstract or ""  # 'abstract' is nullable, an empty text just gets no keywords
+
+    try:
+        keyword_list = extract_keywords_tfidf(streamed_abstracts())  # Fills article_ids while streaming
+        keywords = dict(zip(article_ids, keyword_list))
+    except ValueError as e:  # Raised when no abstract contains a non-stop-word
+        logging.error(f"Error extracting keywords: {e}")
+        keywords = {}
+
+    # Pass 2: summarize and update one page at a time, pass 1 has drained the stream so the connection is free
+    processed = 0
+    page_cursor = connection.cursor(buffered=True)
+    update_cursor = connection.cursor()
+    for rows in page_rows(page_cursor):
+        ids = [article_id for article_id, _ in rows]
+        abstracts = [abstract or "" for _, abstract in rows]
+        summaries = summarize_texts_in_batch(abstracts, batch_size=batch_size)
+        update_cursor.executemany("UPDATE articles SET summary=%s, keywords=%s WHERE id=%s",
+                                  [(summary, keywords.get(article_id, ""), article_id)
+                                   for summary, article_id in zip(summaries, ids)])
+        connection.commit()
+        processed += len(rows)
+        logging.info(f"Processed {processed} articles.")
+        print(f"Processed {processed} articles.")
+
+    update_cursor.close()
+    page_cursor.close()
     cursor.close()
     connection.close()
     logging.info("Summaries and keywords added to MySQL.")
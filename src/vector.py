@@ -1,7 +1,8 @@
 from pymilvus import connections, FieldSchema, CollectionSchema, DataType, Collection
-from sentence_transformers import SentenceTransformer
 import mysql.connector
 import configparser
+from datetime import datetime, time
+from src.embedding import EMBEDDING_DIM, load_embedding_model
 from src.logger import logging
 
 # Configurations
@@ -12,6 +13,12 @@ MILVUS_CONFIG = {"host": config["MILVUS"]["host"], "port": config["MILVUS"]["por
 MYSQL_CONFIG = {key: config["MYSQL"][key] for key in config["MYSQL"]}
 COLLECTION_NAME = config["MILVUS"]["collection_name"]
 
+# Pre-trained model for sentence embeddings, loaded once per process
+_MODEL = load_embedding_model()
+ENCODE_BATCH_SIZE = 64  # Titles per forward pass
+INSERT_CHUNK_SIZE = 10_000  # Titles encoded and inserted into Milvus per chunk
+TITLE_MAX_BYTES = 2000  # Milvus VARCHAR length is in bytes, enough for the VARCHAR(500) utf8mb4 titles in MySQL
+
 
 def connect_milvus():
     """
@@ -35,18 +42,32 @@ def create_collection():
     Output: Collection object
 
     Purpose:
-    This function creates a new collection in the Milvus vector database. The collection schema includes two fields:
+    This function creates a new collection in the Milvus vector database. The collection schema includes four fields:
     - 'id' (INT64): A primary key for each article.
     - 'embedding' (FLOAT_VECTOR): The vector representation of the article titles.
-
-    The collection is indexed using 'IVF_FLAT' with 'L2' distance metric, and 'nlist' is set to 128.
+    - 'pub_date_epoch' (INT64): The publication date as a Unix timestamp, used to filter searches by date.
+    - 'title' (VARCHAR): The article title, returned with the search hits so searches do not need MySQL.
+
+    The collection is indexed using 'HNSW' with the 'IP' (inner product) metric, 'M' set to 16 and 'efConstruction'
+    set to 200. Embeddings are normalized at encode time, so inner product equals cosine similarity without the
+    per-distance normalization.
+    The graph index answers the interactive queries in logarithmic rather than linear time.
+    'pub_date_epoch' gets an 'STL_SORT' scalar index, so date-filtered searches do not scan the whole field.
     """
     schema = CollectionSchema([
         FieldSchema("id", DataType.INT64, is_primary=True),
-        FieldSchema("embedding", DataType.FLOAT_VECTOR, dim=384),  # 384 dimensions for the sentence embeddings
+        FieldSchema("embedding", DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM),  # Truncated sentence embeddings
+        FieldSchema("pub_date_epoch", DataType.INT64),  # Publication date (midnight) as a Unix timestamp
+        FieldSchema("title", DataType.VARCHAR, max_length=TITLE_MAX_BYTES),
     ])
     collection = Collection(COLLECTION_NAME, schema)
-    collection.create_index("embedding", {"index_type": "IVF_FLAT", "metric_type": "L2", "params": {"nlist": 128}})
+    collection.create_index("embedding", {
+        "index_type": "HNSW",
+        "metric_type": "IP",
+        "params": {"M": 16, "efConstruction": 200}
+    })
+    # Sorted scalar index, so the date range filter is resolved by binary search before the ANN traversal
+    collection.create_index("pub_date_epoch", {"index_type": "STL_SORT"})
     return collection
 
 
@@ -58,21 +79,38 @@ def insert_embeddings():
     Output: None
 
     Purpose:
-    This function fetches article titles from the 'articles' table in the MySQL database, generates embeddings for each
-    article title using the SentenceTransformer model, and inserts the embeddings into the Milvus collection.
-    The embeddings are stored as vectors for future similarity search.
+    This function fetches article titles from the 'articles' table in the MySQL database, generates embeddings for the
+    article titles using the SentenceTransformer model (int8 OpenVINO on CPU), and inserts the embeddings into the
+    Milvus collection. The embeddings are stored as vectors for future similarity search, alongside each article's
+    publication date and title so searches can be filtered and displayed without going back to MySQL.
+    Rows are read from MySQL in pages of INSERT_CHUNK_SIZE, keyed by id; each page is encoded in batches of
+    ENCODE_BATCH_SIZE and inserted before the next one is queried, so memory use does not grow with the size of the
+    table and no query is left open on the server while the model runs.
     """
-    model = SentenceTransformer("all-MiniLM-L6-v2")  # Load pre-trained model for sentence embeddings
     connection = mysql.connector.connect(**MYSQL_CONFIG)
-    cursor = connection.cursor()
-    cursor.execute("SELECT id, title FROM articles")  # Query to fetch article titles
-    records = cursor.fetchall()
-
-    embeddings = [model.encode(title) for _, title in records]  # Generate embeddings for each article title
-    ids = [record[0] for record in records]  # Extract the article IDs
+    cursor = connection.cursor(buffered=True)
 
     collection = Collection(COLLECTION_NAME)  # Access the Milvus collection
-    collection.insert([ids, embeddings])  # Insert article IDs and embeddings into Milvus
+    last_id = 0
+    while True:
+        # Page through the table by id, each page is read in full so no result set stays open while it is encoded
+        cursor.execute("SELECT id, title, pub_date FROM articles WHERE id > %s ORDER BY id LIMIT %s",
+                       (last_id, INSERT_CHUNK_SIZE))
+        chunk = cursor.fetchall()
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        ids = [article_id for article_id, _, _ in chunk]  # Extract the article IDs
+        titles = [title or "" for _, title, _ in chunk]
+        pub_dates = [int(datetime.combine(pub_date, time.min).timestamp()) if pub_date else 0
+                     for _, _, pub_date in chunk]  # Articles without a date never match a date filter
+
+        # Encode the whole chunk at once, sentence-transformers sorts by length to minimise padding
+        embeddings = _MODEL.encode(titles, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True,
+                                   show_progress_bar=True, normalize_embeddings=True)
+        collection.insert([ids, embeddings, pub_dates, titles])  # Insert article IDs, embeddings, dates and titles
+    collection.flush(_async=True)  # Seal the inserted segments once, after the last chunk, without blocking on it
+    connection.close()
     logging.info("Embeddings inserted into Milvus.")
 
 